@@ -7,27 +7,58 @@
 
 """Implements a simple slideshow."""
 
+from __future__ import annotations
+
+import io
 import os
 import sys
+import json
+import pickle
+import hashlib
+import functools
+import shutil
 import subprocess
-from urllib.parse import urlparse, ParseResult
+import threading
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+from typing import TYPE_CHECKING
 import tkinter
-import requests
 import PIL
-from PIL import Image, ImageTk
-from bs4 import BeautifulSoup, ResultSet
+from PIL import Image, ImageTk, features
+
+# requests and bs4 take a while to import, and are only needed for web
+# sources, so they are imported where they are first used
+if TYPE_CHECKING:
+    import requests
+    from bs4 import ResultSet, Tag
 
 _debug: bool = False
 VERSION: tuple = (0, 7, 0)
 CONFIG_FILE: str = "bird-slideshow.cfg"
-TRUTH_TABLE: dict = {
-    "True": True,
-    "False": False,
-    "1": True,
-    "0": False,
-    "Yes": True,
-    "No": False,
-}
+CONFIG_CACHE_FILE: str = os.path.expanduser("~/.cache/bird-slideshow/config.pkl")
+# ssh and scp share one connection per server through this socket
+# (%C is replaced by ssh with a hash of the user, host and port)
+SSH_CONTROL_PATH: str = os.path.expanduser("~/.cache/bird-slideshow/ssh-%C")
+IMG_CACHE_SIZE: int = 8
+# milliseconds to wait after the last window resize before redrawing
+RESIZE_DELAY: int = 150
+# seconds to wait for a web server to accept a connection, and then
+# between reads of the response
+HTTP_TIMEOUT: tuple = (5, 30)
+# bytes read from the network at a time when downloading an image
+DOWNLOAD_CHUNK_SIZE: int = 64 * 1024
+# file extensions (in lower case) of the images to show from a directory
+IMG_EXTENSIONS: frozenset = frozenset(
+    {".bmp", ".gif", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp"}
+)
+# downloads between checks of the size of the cache directory
+CACHE_PRUNE_INTERVAL: int = 20
+# sources and image paths starting with these are fetched from a web server
+HTTP_PREFIXES: tuple = ("http://", "https://")
+TRUE_VALUES: frozenset = frozenset({"true", "1", "yes", "y", "on"})
+FALSE_VALUES: frozenset = frozenset({"false", "0", "no", "n", "off"})
 
 
 # Classes
@@ -39,6 +70,51 @@ class Config:  # pylint: disable=R0902
     object.
     """
 
+    __slots__ = (
+        "sources",
+        "wait_time",
+        "start_full",
+        "win_start_res",
+        "win_start_width",
+        "win_start_height",
+        "max_resize",
+        "max_preload",
+        "cache_dir",
+        "small_memory",
+        "prefer_webp",
+        "max_cache_mb",
+        "max_loaded_imgs",
+        "config_file",
+    )
+
+    # how to store the value of each option in the config file
+    _HANDLERS: dict = {
+        "source": lambda self, value: self.sources.append(value),
+        "wait_time": lambda self, value: setattr(
+            self, "wait_time", int(float(value) * 1000)
+        ),
+        "start_full": lambda self, value: setattr(
+            self, "start_full", self.to_bool("start_full", value)
+        ),
+        "default_resolution": lambda self, value: self.set_win_res(value),
+        "max_preload": lambda self, value: setattr(self, "max_preload", int(value)),
+        # constrain to between 0.05 and 50
+        "max_resize": lambda self, value: setattr(
+            self, "max_resize", min(max(float(value), 0.05), 50)
+        ),
+        "cache_dir": lambda self, value: setattr(self, "cache_dir", value),
+        "small_memory": lambda self, value: setattr(
+            self, "small_memory", self.to_bool("small_memory", value)
+        ),
+        "prefer_webp": lambda self, value: setattr(
+            self, "prefer_webp", self.to_bool("prefer_webp", value)
+        ),
+        "max_cache_mb": lambda self, value: setattr(self, "max_cache_mb", int(value)),
+        "max_loaded_imgs": lambda self, value: setattr(
+            self, "max_loaded_imgs", int(value)
+        ),
+    }
+
     # have pyre ignore None casting to type annotated parameter
     def __init__(self, config_file: str = None):  # pyre-ignore[9]
         """Constructs a new instance of the `Config` object.
@@ -48,9 +124,10 @@ class Config:  # pylint: disable=R0902
             is one (default is None)
 
         Calls:
+            ::private_method:`_load_cached_config()`
             ::private_method:`_read_config()`
+            ::private_method:`_save_cached_config()`
             ::private_method:`_input_config()`
-            ::private_method:`_convert_win_res()`
         """
 
         # Default values
@@ -64,15 +141,81 @@ class Config:  # pylint: disable=R0902
         self.max_preload: int = 2
         self.cache_dir: str = "cache"
         self.small_memory: bool = False
+        self.prefer_webp: bool = True
+        self.max_cache_mb: int = 0
+        self.max_loaded_imgs: int = IMG_CACHE_SIZE
 
         self.config_file: str = config_file
 
         if self.config_file:
+            if self._load_cached_config():
+                return
             self._read_config()
+            self._save_cached_config()
         else:
             self._input_config()
 
-        self._convert_win_res()
+    def _config_file_key(self) -> tuple:
+        """Gets the values that identify the current contents of the config
+        file, for checking the parsed config cache.
+
+        Returns:
+            ::return:`tuple` - the program version, the config attributes
+            (so that a cache saved before an option was added is not used),
+            and the config file path, mtime, and size
+
+        Called by:
+            ::private_method:`_load_cached_config()`
+            ::private_method:`_save_cached_config()`
+        """
+        st = os.stat(self.config_file)
+        return (
+            VERSION,
+            tuple(self.__slots__),
+            os.path.abspath(self.config_file),
+            st.st_mtime_ns,
+            st.st_size,
+        )
+
+    def _load_cached_config(self) -> bool:
+        """Loads the attributes parsed from the config file on a previous run,
+        if the config file has not changed since then.
+
+        Returns:
+            ::return:`bool` - True if the attributes were loaded from the cache
+
+        Called by:
+            ::constructor:`self.__init__()`
+        """
+        try:
+            with open(CONFIG_CACHE_FILE, "rb") as cache_file:
+                key, attrs = pickle.load(cache_file)
+            if key != self._config_file_key():
+                return False
+        # have pylint ignore this too-general exception; a bad cache file
+        # just means the config file is parsed again
+        except Exception:  # pylint: disable=W0703
+            return False
+
+        dprint("Using cached config for %s" % self.config_file)
+        for name, value in attrs.items():
+            setattr(self, name, value)
+        return True
+
+    def _save_cached_config(self):
+        """Saves the attributes parsed from the config file, to skip parsing it
+        on the next run.
+
+        Called by:
+            ::constructor:`self.__init__()`
+        """
+        try:
+            os.makedirs(os.path.dirname(CONFIG_CACHE_FILE), exist_ok=True)
+            with open(CONFIG_CACHE_FILE, "wb") as cache_file:
+                attrs: dict = {name: getattr(self, name) for name in self.__slots__}
+                pickle.dump((self._config_file_key(), attrs), cache_file)
+        except OSError as e:
+            dprint("Could not save config cache: %s" % e)
 
     def _read_config(self):
         """Read from config file and assign all the config items in the file to the attributes.
@@ -82,33 +225,22 @@ class Config:  # pylint: disable=R0902
         """
 
         with open(self.config_file, "r", encoding="utf-8") as options_file:
-            for line in options_file:
-                if not line or line.startswith("#"):
-                    continue
-                name, value = line.strip().split("=", 1)
-
-                if name == "source":
-                    source = value
-                    self.sources.append(source)
-                elif name == "wait_time":
-                    self.wait_time = int(float(value) * 1000)
-                elif name == "start_full":
-                    self.start_full = TRUTH_TABLE[value.capitalize()]
-                elif name == "default_resolution":
-                    self.win_start_res = value
-                elif name == "max_preload":
-                    self.max_preload = int(value)
-                elif name == "max_resize":
-                    value = float(value)
-                    # constrain to between 0.05 and 50
-                    value = min(max(value, 0.05), 50)
-                    self.max_resize = value
-                elif name == "cache_dir":
-                    self.cache_dir = value
-                elif name == "small_memory":
-                    self.small_memory = TRUTH_TABLE[value.capitalize()]
-                else:
-                    print("Unknown config option: '%s'" % name)
+            lines: list = options_file.read().splitlines()
+
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name, sep, value = line.partition("=")
+            if not sep:
+                print("Invalid config line (missing '='): '%s'" % line)
+                continue
+
+            handler = self._HANDLERS.get(name)
+            if handler:
+                handler(self, value)
+            else:
+                print("Unknown config option: '%s'" % name)
 
     def _input_config(self):
         """Ask user to input all values for config items and assign them to attributes.
@@ -125,30 +257,71 @@ class Config:  # pylint: disable=R0902
             self.sources.append(source)
         self.wait_time = int(float(input("Wait time in seconds: ")) * 1000)
         value = input("Start in fullscreen mode (True/False): ")
-        self.start_full = TRUTH_TABLE[value.capitalize()]
-        self.win_start_res = input(
-            "Window resolution (in the form '{width}x{height}'): "
-        )
+        self.start_full = self.to_bool("start_full", value)
+        self.set_win_res(input("Window resolution (in the form '{width}x{height}'): "))
         self.max_resize = float(
             input("Max resize factor for image resizing (2 = 200%): ")
         )
         self.cache_dir = input("Directory for cache: ")
 
-    def _convert_win_res(self):
-        """Converts the win_res string into win_width and win_height ints.
+    @staticmethod
+    def to_bool(name: str, value: str) -> bool:
+        """Converts a true/false config value (e.g. 'True', '0', 'yes', 'off')
+        to a bool.
+
+        Args:
+            ::param:`name: str` - the name of the config option
+            ::param:`value: str` - the value given for the option
+
+        Returns:
+            ::return:`bool` - the value as a bool; False if it isn't
+            recognized
 
         Called by:
-            ::constructor:`self.__init__()`
+            ::private_method:`_read_config()`
+            ::private_method:`_input_config()`
+        """
+
+        value = value.strip().lower()
+        if value in TRUE_VALUES:
+            return True
+        if value not in FALSE_VALUES:
+            print("Error: invalid value '%s' for %s, using False" % (value, name))
+        return False
+
+    def set_win_res(self, value: str):
+        """Sets win_start_res, and the win_start_width and win_start_height
+        ints converted from it.
+
+        Args:
+            ::param:`value: str` - the resolution, in the form '{width}x{height}'
+
+        Called by:
+            ::private_method:`_read_config()`
+            ::private_method:`_input_config()`
         """
 
-        width, height = self.win_start_res.split("x")
+        self.win_start_res = value
+        width, height = value.split("x")
         self.win_start_width = int(width)
         self.win_start_height = int(height)
 
 
-class SlideshowImage:
+# have pylint ignore too many instance attributes in this class
+class SlideshowImage:  # pylint: disable=R0902
     """Stores each image type in one object."""
 
+    __slots__ = (
+        "img_path",
+        "local_filepath",
+        "lock",
+        "pil_img",
+        "resized_pil",
+        "resized_for",
+        "resized_data",
+        "tk_img",
+    )
+
     def __init__(self, img_path: str):
         """Constructs a new instance of `SlideshowImage`
 
@@ -157,48 +330,87 @@ class SlideshowImage:
         """
         self.img_path: str = img_path
         self.local_filepath: str = ""
+        # serializes downloading and decoding this image between threads
+        # (reentrant, as loading the image also downloads it)
+        self.lock: threading.RLock = threading.RLock()
         # have pyre ignore type annotated attributes initialized as None
         self.pil_img: Image.Image = None  # pyre-ignore[8]
+        # pil_img resized by the prefetch thread, and the window size it
+        # was resized for
+        self.resized_pil: Image.Image = None  # pyre-ignore[8]
+        self.resized_for: tuple = (0, 0)
+        # resized_pil encoded by the prefetch thread, for tkinter to read
+        self.resized_data: bytes = b""
         self.tk_img: ImageTk.PhotoImage = None  # pyre-ignore[8]
 
+    def is_remote(self) -> bool:
+        """Returns True if the image has to be downloaded into the cache."""
+        return self.img_path.startswith((*HTTP_PREFIXES, "ssh:"))
+
     def get_image_local(self):
         """Gets an image file from image path into local filesystem.  If
         the image is remote (web or ssh), it is downloaded to the cache
         and a cache filepath is returned.
 
+        This may be called from several worker threads at once, so the
+        download is done under the image's lock, and only once.
+
         Returns:
             ::return:`filepath, img_src` - the path to the image file, and
               a string describing the image source
 
         Called by:
             ::method:'load_pil_from_path()'
+            ::function:'preload_imgs()'
         """
-        global config
-
-        if self.img_path.startswith("http"):
-            img_src = "downloaded from web"
-            filepath = download_web_img(config.cache_dir, self.img_path)
-            if not filepath:
-                print("Error: could not load remote image from path %s" % self.img_path)
-        elif self.img_path.startswith("ssh:"):
-            img_src = "downloaded from ssh"
-            filepath = download_ssh_img(config.cache_dir, self.img_path)
-            if not filepath:
-                print("Error: could not load remote image from path %s" % self.img_path)
-        else:
-            img_src = "from local filesystem"
-            filepath = self.img_path
+        with self.lock:
+            if self.local_filepath:
+                img_src = "from previous download"
+                filepath = self.local_filepath
+            elif self.img_path.startswith(HTTP_PREFIXES):
+                img_src = "downloaded from web"
+                filepath = download_web_img(config.cache_dir, self.img_path)
+                if not filepath:
+                    print(
+                        "Error: could not load remote image from path %s"
+                        % self.img_path
+                    )
+            elif self.img_path.startswith("ssh:"):
+                img_src = "downloaded from ssh"
+                filepath = download_ssh_img(config.cache_dir, self.img_path)
+                if not filepath:
+                    print(
+                        "Error: could not load remote image from path %s"
+                        % self.img_path
+                    )
+            else:
+                img_src = "from local filesystem"
+                filepath = self.img_path
+
+            # keep the cache directory in least recently used order, by
+            # marking the file as used each time the image is loaded
+            if filepath and self.is_remote():
+                touch_cache_file(filepath)
+
+            self.local_filepath = filepath
 
         return filepath, img_src
 
-    def load_pil_from_path(self):
+    # have pyre ignore None casting to type annotated parameter
+    def load_pil_from_path(self, target: tuple = None):  # pyre-ignore[9]
         """Takes an image path and turns it into a PIL image.
 
         Downloads the image file into cache if necessary, then reads the
         image file into a PIL image in memory.
 
+        Args:
+            ::param:`target: tuple` - the largest (width, height) the image
+            will be shown at.  JPEG images much bigger than this are decoded
+            at a reduced scale (1/2, 1/4 or 1/8), which is a lot faster.
+            (default is None, for decoding at full size)
+
         Called by:
-            ::function:`async_preload_img()`
+            ::function:`prefetch_loop()`
             ::function:`preload_imgs()`
             ::function:`update_img()`
 
@@ -207,33 +419,119 @@ class SlideshowImage:
             ::function:`download_ssh_img()`
         """
 
-        global config
-        global load_count
-
         if self.pil_img:
             return
 
-        # if image is not already downloaded, put it into local cache
-        img_src = "from previous download"
-        if not self.local_filepath:
-            filepath, img_src = self.get_image_local()
-            self.local_filepath = filepath
+        # if another thread is loading this image, wait for it to finish,
+        # instead of loading it a second time
+        with self.lock:
+            if self.pil_img:
+                return
+
+            # if image is not already downloaded, put it into local cache
+            _, img_src = self.get_image_local()
+
+            img: Image.Image = None
+            try:
+                dprint("loading PIL image for file %s" % self.local_filepath)
+                img = Image.open(self.local_filepath)
+                if target and min(target) > 0 and img.format == "JPEG":
+                    img.draft("RGB", target)
+                # keep images as 3 channels (or 1), so that resizing and making
+                # tk images don't have to carry an alpha channel or palette
+                if img.mode not in ("RGB", "L"):
+                    img = flatten_img(img)
+                # decode now, on the loading thread; Image.open only reads the
+                # header, and a lazily decoded image is not safe to resize
+                # from two threads at once
+                img.load()
+            except FileNotFoundError:
+                print("Error: could not load image from path %s" % self.local_filepath)
+                # the cached copy may have been pruned; fetch it again next time
+                if self.is_remote():
+                    self.local_filepath = ""
+            except PIL.UnidentifiedImageError:
+                print(
+                    "Error: data %s, for path '%s' is invalid (not an image)"
+                    % (img_src, self.img_path)
+                )
+            except OSError as e:
+                # decoding the image may find that it is broken
+                print("Error: could not decode image '%s': %s" % (self.img_path, e))
+                img = None
+
+            if img:
+                self.pil_img = img
+
+    def unload(self):
+        """Drops the loaded images, leaving the image to be loaded again from
+        its local file.
 
-        img: Image.Image = None
-        try:
-            dprint("loading PIL image for file %s" % self.local_filepath)
-            img = Image.open(self.local_filepath)
-        except FileNotFoundError:
-            print("Error: could not load image from path %s" % self.local_filepath)
-        except PIL.UnidentifiedImageError:
-            print(
-                "Error: data %s, for path '%s' is invalid (not an image)"
-                % (img_src, self.img_path)
-            )
+        Called by:
+            ::ImageCache_method:`add()`
+            ::function:`next_img()`
+        """
+        dprint("Unloading img: %s" % self.img_path)
+        self.tk_img = None
+        self.resized_pil = None
+        self.resized_data = b""
+        self.pil_img = None
+
+
+class ImageCache:
+    """Keeps track of which `SlideshowImage` objects have images loaded in
+    memory, and unloads the least recently used ones so that at most
+    `maxsize` are loaded at once.
+    """
+
+    def __init__(self, maxsize: int):
+        """Constructs a new instance of `ImageCache`
+
+        Args:
+            ::param:`maxsize: int` - the maximum number of loaded images
+        """
+        self.maxsize: int = maxsize
+        self.imgs: OrderedDict = OrderedDict()
+        # the image on screen, which must never be unloaded
+        # have pyre ignore type annotated attributes initialized as None
+        self.pinned: SlideshowImage = None  # pyre-ignore[8]
+        self.lock: threading.Lock = threading.Lock()
+
+    def add(self, img: SlideshowImage):
+        """Marks an image as most recently used, and unloads the oldest
+        images if there are too many loaded.
+
+        Args:
+            ::param:`img: SlideshowImage` - the image that was loaded or used
+
+        Called by:
+            ::function:`preload_imgs()`
+            ::function:`get_prefetched_imgs()`
+            ::function:`update_img()`
+        """
+        with self.lock:
+            self.imgs[img] = None
+            self.imgs.move_to_end(img)
+
+            for old_img in list(self.imgs):
+                if len(self.imgs) <= self.maxsize:
+                    break
+                if old_img is self.pinned or old_img is img:
+                    continue
+                del self.imgs[old_img]
+                old_img.unload()
+
+    def discard(self, img: SlideshowImage):
+        """Stops tracking an image that was unloaded by the caller.
+
+        Args:
+            ::param:`img: SlideshowImage` - the image that was unloaded
 
-        if img:
-            self.pil_img = img
-            load_count += 1
+        Called by:
+            ::function:`next_img()`
+        """
+        with self.lock:
+            self.imgs.pop(img, None)
 
 
 # Global Variables
@@ -241,15 +539,42 @@ class SlideshowImage:
 slideshow_imgs: list = []
 config: Config = None  # pyre-ignore[9]
 imgs_index: int = -1
-preload_index: int = -1
-load_count: int = 0
+# downloads into the cache directory since it was last pruned
+cache_downloads: int = 0
+cache_lock: threading.Lock = threading.Lock()
+img_cache: ImageCache = ImageCache(IMG_CACHE_SIZE)
+
+# resized images from the prefetch thread, waiting to be picked up by the
+# tkinter thread, and an event to wake the prefetch thread up
+prefetch_q: queue.Queue = None  # pyre-ignore[9]
+prefetch_wanted: threading.Event = threading.Event()
 
 win: tkinter.Tk = None  # pyre-ignore[9]
 canvas: tkinter.Canvas = None  # pyre-ignore[9]
+# ids of the items on the canvas
+canvas_img: int = 0
+pause_bg: int = 0
+pause_text: int = 0
+# the image on the canvas, and the window size it was resized for
+shown: tuple = ()
+# pending redraw after the window was resized
+resize_job: str = ""
 is_full: bool = False
 is_paused: bool = False
 win_width: int = 958
 win_height: int = 720
+# the size of the screen, which is as big as an image is ever shown
+screen_width: int = 0
+screen_height: int = 0
+
+# Shared HTTP session, so that connections to a web server are reused
+# between page and image requests (made by get_session() when first
+# needed), and a pool of threads for fetching them concurrently
+session: requests.Session = None  # pyre-ignore[9]
+session_lock: threading.Lock = threading.Lock()
+download_pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=16)
+# the background downloads of the rest of the gallery, cancelled on quit
+background_downloads: list = []
 
 
 # Global Functions
@@ -272,6 +597,7 @@ def eprint(*args, **kwargs):
     print(f"\n{colored_error}" + str(*args[:1]), *args[1:], **kwargs)
 
 
+@functools.lru_cache(maxsize=1)
 def find_config_file():
     """Finds the config file depending on what operating system is running
     this program.
@@ -310,7 +636,7 @@ def find_config_file():
     script_file = os.path.realpath(__file__)
     dprint("script_file = " + script_file)
     script_dir = os.path.dirname(script_file)
-    file_path = script_dir + os.sep + CONFIG_FILE
+    file_path = os.path.join(script_dir, CONFIG_FILE)
     dprint(file_path)
     if os.path.exists(file_path):
         return file_path
@@ -321,7 +647,8 @@ def find_config_file():
 
 def define_cache(cfg: Config):
     """Creates a cache folder if the name of the one in the passed `Config`
-    object does not already exist.
+    object does not already exist.  An existing cache folder is trimmed to
+    the configured maximum size.
 
     Args:
         ::param:`cfg: Config` - the `Config` object to get the cache
@@ -333,6 +660,8 @@ def define_cache(cfg: Config):
 
     if not os.path.exists(cfg.cache_dir):
         os.mkdir(cfg.cache_dir)
+    elif cfg.max_cache_mb > 0:
+        prune_cache(cfg.cache_dir, cfg.max_cache_mb * 1024 * 1024)
 
 
 def init_window():
@@ -349,16 +678,44 @@ def init_window():
         ::function:`rotate_img_forward()`
         ::function:`rotate_img_back()`
         ::function:`update_win_info()`
+        ::function:`on_configure()`
     """
 
     global win, canvas
+    global canvas_img, pause_bg, pause_text
+    global screen_width, screen_height
 
     win = tkinter.Tk()
     win.title("Slideshow")
+    screen_width = win.winfo_screenwidth()
+    screen_height = win.winfo_screenheight()
     win.geometry(config.win_start_res)
     canvas = tkinter.Canvas(win, width=win_width, height=win_height, bg="black")
     canvas.pack(fill=tkinter.BOTH, expand=True)
 
+    # the canvas items are created once, and updated by update_img()
+    canvas_img = canvas.create_image(
+        win_width / 2, win_height / 2, anchor=tkinter.CENTER
+    )
+    # paused status: text on a black background for readability
+    pause_bg = canvas.create_rectangle(
+        win_width / 2 - 50,
+        36,
+        win_width / 2 + 50,
+        64,
+        fill="black",
+        state=tkinter.HIDDEN,
+    )
+    pause_text = canvas.create_text(
+        win_width / 2,
+        50,
+        anchor=tkinter.CENTER,
+        text=" paused ",
+        fill="white",
+        font=("Helvetica 15 bold"),
+        state=tkinter.HIDDEN,
+    )
+
     win.attributes("-fullscreen", config.start_full)
     win.bind("<F11>", toggle_fullscreen)
     win.bind("<Escape>", quit_window)
@@ -366,6 +723,7 @@ def init_window():
     win.bind("<Right>", rotate_img_forward)
     win.bind("<Left>", rotate_img_back)
     win.bind("p", toggle_pause)
+    win.bind("<Configure>", on_configure)
     update_win_info()
 
 
@@ -410,12 +768,18 @@ def quit_window(event):  # pylint: disable=W0613
     Called by:
         ::function:`init_window()`
     """
+    # shutdown(cancel_futures=True) needs Python 3.9, so cancel the queued
+    # downloads here
+    for future in background_downloads:
+        future.cancel()
+    download_pool.shutdown(wait=False)
     win.destroy()
 
 
 def get_paths(sources: list):
     """Takes each source in passed sources and stores the path as an attribute
-    of `SlideshowImage` and appends to global list slideshow_imgs.
+    of `SlideshowImage` and appends to global list slideshow_imgs.  Images
+    found by more than one source are only added once.
 
     Args:
         ::param:`sources: list[str]` - the list of sources from the `Config` object
@@ -427,12 +791,20 @@ def get_paths(sources: list):
         ::function:`get_file_paths()`
         ::function:`get_http_paths()`
         ::function:`get_ssh_paths()`
+        ::function:`fetch_html()`
     """
 
+    # fetch all the web pages at once, then scan them in source order
+    pages: dict = {
+        src: download_pool.submit(fetch_html, src)
+        for src in sources
+        if src.startswith(HTTP_PREFIXES)
+    }
+
     src: str
     for src in sources:
-        if src.startswith("http"):
-            get_http_paths(src)
+        if src.startswith(HTTP_PREFIXES):
+            get_http_paths(src, pages[src].result())
         elif src.startswith("ssh"):
             get_ssh_paths(src)
         elif src.startswith("tagger"):
@@ -440,62 +812,195 @@ def get_paths(sources: list):
         else:
             get_file_paths(src)
 
+    # drop images found by more than one source (e.g. a picture linked
+    # from two pages), so that each is only downloaded and decoded once
+    unique: dict = {}
+    for img in slideshow_imgs:
+        if img.is_remote():
+            key: str = img.img_path
+        else:
+            key = os.path.normcase(os.path.normpath(img.img_path))
+        unique.setdefault(key, img)
+    if len(unique) < len(slideshow_imgs):
+        dprint("dropped %d duplicate images" % (len(slideshow_imgs) - len(unique)))
+        slideshow_imgs[:] = unique.values()
+
+
+def is_img_alive(img: SlideshowImage) -> bool:
+    """Checks whether the file for an image is there to be loaded.
+
+    Local files are checked with os.path.exists, and web images with a HEAD
+    request, unless they are already in the cache.  Images from ssh sources
+    are assumed to be there, as checking them costs an ssh connection each.
+    A web image is only dropped when the server says it is gone; servers
+    that don't support HEAD (405/501) or can't be reached leave it in, for
+    download_web_img() to deal with.
+
+    Args:
+        ::param:`img: SlideshowImage` - the image to check
+
+    Returns:
+        ::return:`bool` - False if the image can't be loaded
+
+    Called by:
+        ::function:`remove_dead_paths()`
+    """
+    if img.img_path.startswith(HTTP_PREFIXES):
+        if os.path.exists(get_cache_path(config.cache_dir, img.img_path)):
+            return True
+
+        # have pylint ignore the import not at the top of the file
+        from requests import RequestException  # pylint: disable=C0415
+
+        try:
+            response = get_session().head(img.img_path, allow_redirects=True, timeout=3)
+        except RequestException:
+            return True
+        return response.status_code < 400 or response.status_code in (405, 501)
+
+    if img.img_path.startswith("ssh:"):
+        return True
+
+    return os.path.exists(img.img_path)
+
+
+def remove_dead_paths():
+    """Removes the images that can't be loaded from global list slideshow_imgs,
+    once, before the slideshow starts (instead of finding them each time
+    they come around).  The images are checked concurrently.
+
+    Called by:
+        ::__main__:`main()`
+
+    Calls:
+        ::function:`is_img_alive()`
+    """
+    alive: list = list(download_pool.map(is_img_alive, slideshow_imgs))
+    for img, ok in zip(slideshow_imgs, alive):
+        if not ok:
+            print("Error: skipping missing image %s" % img.img_path)
+    slideshow_imgs[:] = [img for img, ok in zip(slideshow_imgs, alive) if ok]
+
+
+def get_session() -> requests.Session:
+    """Gets the shared HTTP session, making it the first time.  requests is
+    only imported then, so that slideshows of local pictures don't have to
+    wait for it to load.
+
+    Returns:
+        ::return:`requests.Session` - the session
+
+    Called by:
+        ::function:`is_img_alive()`
+        ::function:`fetch_html()`
+        ::function:`download_web_img()`
+    """
+    global session
+
+    if session is not None:
+        return session
+
+    with session_lock:
+        if session is None:
+            # have pylint ignore the imports not at the top of the file
+            # pylint: disable=C0415
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            new_session: requests.Session = requests.Session()
+            # retry dropped connections and busy servers a few times,
+            # backing off; a server that stays busy gets its last response
+            # returned (not a RetryError), like it did before retrying
+            http_adapter: HTTPAdapter = HTTPAdapter(
+                pool_connections=32,
+                pool_maxsize=32,
+                max_retries=Retry(
+                    total=3,
+                    backoff_factor=0.3,
+                    status_forcelist=(502, 503, 504),
+                    raise_on_status=False,
+                ),
+            )
+            new_session.mount("http://", http_adapter)
+            new_session.mount("https://", http_adapter)
+            session = new_session
+
+    return session
 
-def get_http_paths(url: str):
+
+def fetch_html(url: str) -> bytes:
+    """Gets the html of a web page source.
+
+    The raw bytes are returned; the parser finds the encoding from the page
+    itself, which is faster than having requests guess it from the whole
+    body when the server does not send a charset.
+
+    Args:
+        ::param:`url: str` - comes from the `Config` source attribute
+
+    Returns:
+        ::return:`bytes` - the html of the page
+
+    Called by:
+        ::function:`get_paths()`
+    """
+    dprint("getting html for url %s" % url)
+    return get_session().get(url, timeout=HTTP_TIMEOUT).content
+
+
+def get_http_paths(url: str, html: bytes):
     """Gets the <img> tags from the html, gets image links from the src
     attribute of each tag, and creates new instances of `SlideshowImage` using
     the links which are then appended to global list.
 
     Args:
         ::param:`url: str` - comes from the `Config` source attribute
+        ::param:`html: bytes` - the html of the page at url
 
     Called by:
         ::function:`get_paths()`
 
     Calls:
         ::function:`get_img_tags()`
+        ::function:`get_webp_src()`
     """
-    global slideshow_imgs
-
-    dprint("getting html for url %s" % url)
-    html: str = requests.get(url, timeout=10).text
-    dprint("html=\n'%s'" % html)
+    # formatting the whole page (and all its tags) is slow, so only do it
+    # when debugging
+    if _debug:
+        dprint("html=\n'%s'" % html)
     tags: ResultSet = get_img_tags(html)
-    dprint("tags=%s" % tags)
+    if _debug:
+        dprint("tags=%s" % tags)
 
     if not tags:
         print("Error: no image tags found on web page: %s" % url)
         return
 
+    # This does not handle srcset stuff, except for WebP <source> tags
     for img_tag in tags:
-        # link = get_link(url, tag)
-
-        # This does not handle srcset stuff
-
-        base_url: str = os.path.dirname(url)
-        dprint("base_url=%s" % base_url)
-        url_parts: ParseResult = urlparse(url)
-        url_prefix: str = url_parts.scheme + "://" + url_parts.netloc
-
         img_link: str = img_tag.get("src", None)
+        # WebP images are smaller to download, and quick to decode
+        if config.prefer_webp:
+            img_link = get_webp_src(img_tag) or img_link
+        if not img_link:
+            continue
 
-        if img_link.startswith("./"):
-            img_link = url_prefix + img_link[1:]
-        elif img_link.startswith("/"):
-            img_link = url_prefix + img_link
-        else:
-            img_link = url_prefix + "/" + img_link
+        # resolve relative links ('x.jpg', './x.jpg', '/x.jpg') against the
+        # page url; absolute links are returned unchanged
+        img_link = urljoin(url, img_link)
 
-        dprint("Adding %s to img_paths" % img_link)
+        if _debug:
+            dprint("Adding %s to img_paths" % img_link)
         slideshow_imgs.append(SlideshowImage(img_link))
 
 
-def get_img_tags(html: str) -> ResultSet:
+def get_img_tags(html: bytes) -> ResultSet:
     """Gets all the html <img> tags (e.x. <img src="..." height=...>) from the
     passed html text.
 
     Args:
-        ::param:`html: str` - the full html text from the src url
+        ::param:`html: bytes` - the full html from the src url
 
     Returns:
         ::return:`ResultSet[Tag]` - a list of html <img> tags
@@ -503,14 +1008,70 @@ def get_img_tags(html: str) -> ResultSet:
     Called by:
         ::function:`get_http_paths()`
     """
-    # Parse HTML Code
-    soup = BeautifulSoup(html, "html.parser")
+    # Parse HTML Code, only building tree nodes for the <img> tags (and the
+    # <picture> tags around them, which may have other versions of the image)
+    # have pylint ignore the import not at the top of the file
+    from bs4 import BeautifulSoup, SoupStrainer  # pylint: disable=C0415
+
+    soup = BeautifulSoup(html, "lxml", parse_only=SoupStrainer(["picture", "img"]))
     # find all images in URL
-    img_tags: ResultSet = soup.findAll("img")
-    dprint("img_tags=%s" % img_tags)
+    img_tags: ResultSet = soup.find_all("img")
+    if _debug:
+        dprint("img_tags=%s" % img_tags)
     return img_tags
 
 
+def get_webp_src(img_tag: Tag) -> str:
+    """Gets the link to the WebP version of an image, from a
+    <source type="image/webp" srcset="..."> tag in the <picture> tag around
+    the <img> tag.
+
+    Args:
+        ::param:`img_tag: Tag` - an <img> tag from the page
+
+    Returns:
+        ::return:`str` - the link to the WebP image, or an empty string if
+        the page does not offer one
+
+    Called by:
+        ::function:`get_http_paths()`
+    """
+    picture: Tag = img_tag.find_parent("picture")
+    if not picture:
+        return ""
+
+    source: Tag = picture.find("source", type="image/webp")
+    if not source:
+        return ""
+
+    # srcset is a list of 'link [descriptor]' candidates; use the first one
+    candidate: list = source.get("srcset", "").split(",")[0].split()
+    return candidate[0] if candidate else ""
+
+
+def ssh_options() -> list:
+    """Gets the command line options that make ssh and scp reuse a single
+    connection to each server, instead of doing a new handshake for every
+    command.  The connection is kept open for a minute after its last use.
+
+    Returns:
+        ::return:`list` - options for /usr/bin/ssh or /usr/bin/scp
+
+    Called by:
+        ::function:`get_ssh_paths()`
+        ::function:`download_ssh_img()`
+    """
+    os.makedirs(os.path.dirname(SSH_CONTROL_PATH), exist_ok=True)
+    return [
+        "-o",
+        "ControlMaster=auto",
+        "-o",
+        "ControlPath=" + SSH_CONTROL_PATH,
+        "-o",
+        "ControlPersist=60",
+    ]
+
+
 def ssh_path_elements(src_path: str) -> tuple:
     """Gets the parts of an ssh src path: user, password, server, path
 
@@ -565,9 +1126,9 @@ def get_ssh_paths(src_path: str):  # pylint: disable=R0914,R0912
 
     Calls:
         ::function:`ssh_path_elements()`
+        ::function:`ssh_options()`
+        ::function:`get_cache_path()`
     """
-    global slideshow_imgs
-
     dprint("getting directory listing for %s" % src_path)
     user, password, server, path = ssh_path_elements(src_path)
     # build appropriate exec string based on src_path elements
@@ -584,7 +1145,7 @@ def get_ssh_paths(src_path: str):  # pylint: disable=R0914,R0912
     # escape spaces in path
     escaped_path = path.replace(" ", "\\ ")
 
-    cmd += ["/usr/bin/ssh", user_and_host, "ls", "-F", escaped_path]
+    cmd += ["/usr/bin/ssh", *ssh_options(), user_and_host, "ls", "-F", escaped_path]
 
     dprint("cmd=%s" % cmd)
 
@@ -614,7 +1175,7 @@ def get_ssh_paths(src_path: str):  # pylint: disable=R0914,R0912
         if line.endswith("*"):
             line = line[:-1]
         ext = os.path.splitext(line)[1]
-        if ext in [".png", ".jpeg", ".JPG", ".jpg"]:
+        if ext.lower() in IMG_EXTENSIONS:
             ssh_path = "ssh:%s@%s:%s/%s" % (user_and_pw, server, path, line)
             slideshow_imgs.append(SlideshowImage(ssh_path))
         else:
@@ -667,54 +1228,171 @@ def get_file_paths(directory: str):
         ::function:`get_paths()`
     """
 
-    global slideshow_imgs
-
-    saved_dir: str = os.getcwd()
-    os.chdir(directory)
-    img_filenames: list = os.listdir()
-
-    if not img_filenames:
+    # scan using the absolute directory path, so that each entry's path is
+    # absolute, without changing the working directory (which the download
+    # threads depend on)
+    with os.scandir(os.path.abspath(directory)) as entries:
+        img_paths: list = [
+            entry.path
+            for entry in entries
+            if os.path.splitext(entry.name)[1].lower() in IMG_EXTENSIONS
+            and entry.is_file()
+        ]
+
+    if not img_paths:
         print("Error: no image files found in directory %s" % directory)
 
-    for filename in img_filenames:
-        path: str = os.path.abspath(filename)
+    for path in img_paths:
         slideshow_imgs.append(SlideshowImage(path))
-    os.chdir(saved_dir)
 
 
 def async_preload_img():
-    """Increment preload_index then load the PIL image of the `SlideshowImage`
-    at that preload_index.
+    """Wakes up the prefetch thread to load and resize the images ahead of
+    imgs_index.
 
     Called by:
-        ::function:`next_img()`
+        ::function:`advance_img()`
+        ::__main__:`main()`
+    """
+    prefetch_wanted.set()
+
+
+def prefetch_loop():
+    """Loads and resizes the images within `config.max_preload` images after
+    imgs_index, and hands them to the tkinter thread through prefetch_q.
+    Runs in its own thread, so that decoding and resizing images overlaps
+    with displaying them.
+
+    Only PIL work is done here; the tk image has to be created on the
+    tkinter thread.
+
+    Called by:
+        ::__main__:`main()` (as a thread)
 
     Calls:
         ::SlideshowImage_method:`load_pil_from_path()`
+        ::function:`resize_img()`
+        ::function:`encode_tk_data()`
     """
 
-    global slideshow_imgs
-    global preload_index
-    global load_count
-    global win
+    while True:
+        prefetch_wanted.wait()
+        prefetch_wanted.clear()
+
+        # only preload the images just ahead of the one on screen, so that
+        # the image cache doesn't unload them again before they are shown
+        for offset in range(1, config.max_preload + 1):
+            index: int = (imgs_index + offset) % len(slideshow_imgs)
+            img: SlideshowImage = slideshow_imgs[index]
+            size: tuple = (win_width, win_height)
+            if img.resized_pil and img.resized_for == size:
+                continue
+
+            dprint("IN PREFETCH LOOP: index = %s" % index)
+            # a failure here would end the thread, and with it all
+            # prefetching, so skip the image and leave it to update_img()
+            try:
+                img.load_pil_from_path((screen_width, screen_height))
+                pil_img: Image.Image = img.pil_img
+                if not pil_img:
+                    continue
+
+                pil_img_r: Image.Image = resize_img(pil_img, size)
+                tk_data: bytes = encode_tk_data(pil_img_r)
+            # have pylint ignore this too-general exception
+            except Exception as e:  # pylint: disable=W0703
+                dprint("could not prefetch %s: %s" % (img.img_path, e))
+                continue
 
-    if load_count >= len(slideshow_imgs):
-        dprint("IN ASYNC PRELOAD: done")
-        return
+            # blocks while the tkinter thread is behind
+            prefetch_q.put((img, pil_img_r, tk_data, size))
 
-    preload_index += 1
-    if preload_index >= len(slideshow_imgs) - 1:
-        preload_index = 0
 
-    dprint("IN ASYNC PRELOAD: preload_index = %s" % preload_index)
+def encode_tk_data(pil_img: Image.Image) -> bytes:
+    """Encodes a PIL image as PPM data, which tkinter can read directly into
+    a photo image.  PPM is not compressed, so there is nothing left for the
+    tkinter thread to decode.
+
+    Args:
+        ::param:`pil_img: Image.Image` - the (resized) pil img
+
+    Returns:
+        ::return:`bytes` - the PPM data, or empty bytes if the image mode
+        has no PPM form (e.g. it has an alpha channel)
+
+    Called by:
+        ::function:`prefetch_loop()`
+    """
+    if pil_img.mode not in ("RGB", "L"):
+        return b""
+
+    buf = io.BytesIO()
+    pil_img.save(buf, "PPM")
+    return buf.getvalue()
 
-    # IF pil_img of SlideshowImage at preload_i is None
-    if not slideshow_imgs[preload_index].pil_img:
-        # pil_img of SlideshowImage at preload_i <- loaded img_path
-        slideshow_imgs[preload_index].load_pil_from_path()
-    else:
-        return
-    # win.after(100, async_preload_img())
+
+def get_prefetched_imgs():
+    """Picks up the images resized by the prefetch thread, and registers
+    them with the image cache.
+
+    Called by:
+        ::function:`update_img()`
+    """
+    while True:
+        try:
+            img, pil_img_r, data, size = prefetch_q.get_nowait()
+        except queue.Empty:
+            return
+
+        if not img.pil_img:
+            # unloaded while it was in the queue
+            continue
+        img.resized_pil = pil_img_r
+        img.resized_for = size
+        img.resized_data = data
+        img_cache.add(img)
+
+
+def get_cache_path(cache_dir: str, img_path: str) -> str:
+    """Gets the path a remote (web or ssh) image is cached at.  Cache files
+    are named by a hash of the image path, so that images with the same
+    filename on different pages or servers don't collide, and so that
+    prune_cache() can tell them apart from other files.
+
+    Args:
+        :param:`cache_dir: str` - the cache directory
+        :param:`img_path: str` - the http or ssh path to the remote image
+
+    Returns:
+        ::return:`str` - the path of the image's file in the cache
+
+    Called by:
+        ::function:`is_img_alive()`
+        ::function:`download_web_img()`
+        ::function:`download_ssh_img()`
+    """
+    key: str = hashlib.sha256(img_path.encode()).hexdigest()
+    if img_path.startswith(HTTP_PREFIXES):
+        img_path = urlparse(img_path).path
+    ext: str = os.path.splitext(img_path)[1]
+    return os.path.join(cache_dir, key + ext)
+
+
+def is_cache_file(filename: str) -> bool:
+    """Checks whether a file in the cache directory is named like the images
+    get_cache_path() puts there (a sha256 hex digest and an extension).
+
+    Args:
+        :param:`filename: str` - the name of the file
+
+    Returns:
+        ::return:`bool` - True if the file is a cached image
+
+    Called by:
+        ::function:`prune_cache()`
+    """
+    key: str = filename.partition(".")[0]
+    return len(key) == 64 and all(c in "0123456789abcdef" for c in key)
 
 
 def download_web_img(cache_dir: str, img_link: str) -> str:
@@ -732,22 +1410,44 @@ def download_web_img(cache_dir: str, img_link: str) -> str:
         ::SlideshowImage_method:`load_pil_from_path()`
     """
 
-    dprint("In download_web_img (line 338) cache_dir = %s" % cache_dir)
-    filename: str = os.path.basename(img_link)
-    filepath: str = cache_dir + os.sep + filename
+    dprint("In download_web_img cache_dir = %s" % cache_dir)
+    filepath: str = get_cache_path(cache_dir, img_link)
+    meta_path: str = os.path.splitext(filepath)[0] + ".meta.json"
 
+    # if the image is in the cache, ask the server whether it has changed
+    headers: dict = {}
     if os.path.exists(filepath):
-        dprint("Using img " + filename + " from cache directory")
-        return filepath
+        meta: dict = read_cache_meta(meta_path)
+        if not meta:
+            dprint("Using img " + img_link + " from cache directory")
+            return filepath
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
 
     try:
-        print("Downloading img", img_link)
-        response = requests.get(img_link, timeout=10)
-
-        # print("filepath =", filepath)
-
-        with open(filepath, "wb+") as f:
-            f.write(response.content)
+        with get_session().get(
+            img_link, headers=headers, stream=True, timeout=HTTP_TIMEOUT
+        ) as response:
+            if response.status_code == 304:
+                dprint("Using img " + img_link + " from cache directory (not modified)")
+                return filepath
+            # don't save an error page into the cache as the image
+            response.raise_for_status()
+
+            print("Downloading img", img_link)
+            # stream the body straight into a temporary file, and only move
+            # it into place once complete, so that an interrupted download
+            # is never mistaken for a cached image
+            response.raw.decode_content = True
+            part_path: str = filepath + ".part"
+            with open(part_path, "wb") as f:
+                shutil.copyfileobj(response.raw, f, DOWNLOAD_CHUNK_SIZE)
+            os.replace(part_path, filepath)
+
+            write_cache_meta(meta_path, response.headers)
+            cache_file_added(cache_dir)
 
         return filepath
 
@@ -755,10 +1455,156 @@ def download_web_img(cache_dir: str, img_link: str) -> str:
     # maybe later come back and catch some request-specific exceptions here
     # for better diagnostics
     except Exception:  # pylint: disable=W0703
+        if os.path.exists(filepath):
+            print("Warning: Could not revalidate %s, using cached copy" % img_link)
+            return filepath
         print("Error: Could not download %s" % img_link)
         return ""
 
 
+def touch_cache_file(filepath: str):
+    """Marks a file in the cache directory as just used, by updating its
+    modification time, which prune_cache() uses to find the least recently
+    used files.
+
+    Args:
+        :param:`filepath: str` - the path to the file in the cache
+
+    Called by:
+        ::SlideshowImage_method:`get_image_local()`
+        ::function:`update_img()`
+    """
+    try:
+        os.utime(filepath)
+    except OSError as e:
+        dprint("could not update time of %s: %s" % (filepath, e))
+
+
+def cache_file_added(cache_dir: str):
+    """Counts a download into the cache directory, and prunes the directory
+    every `CACHE_PRUNE_INTERVAL` downloads, if its size is limited.
+
+    Args:
+        :param:`cache_dir: str` - the cache directory
+
+    Called by:
+        ::function:`download_web_img()`
+        ::function:`download_ssh_img()`
+
+    Calls:
+        ::function:`prune_cache()`
+    """
+    global cache_downloads
+
+    if config.max_cache_mb <= 0:
+        return
+
+    with cache_lock:
+        cache_downloads += 1
+        if cache_downloads < CACHE_PRUNE_INTERVAL:
+            return
+        cache_downloads = 0
+        prune_cache(cache_dir, config.max_cache_mb * 1024 * 1024)
+
+
+def prune_cache(cache_dir: str, max_bytes: int):
+    """Removes the least recently used images from the cache directory, until
+    the images in it take up at most max_bytes.  Only files named like the
+    cached images (see get_cache_path()) are counted and removed.
+
+    Args:
+        :param:`cache_dir: str` - the cache directory
+        :param:`max_bytes: int` - the most bytes of images to keep
+
+    Called by:
+        ::function:`define_cache()`
+        ::function:`cache_file_added()`
+
+    Calls:
+        ::function:`is_cache_file()`
+    """
+    files: list = []
+    total: int = 0
+    with os.scandir(cache_dir) as entries:
+        for entry in entries:
+            # sidecar files go with their image, downloads in progress are
+            # left alone, and so is anything this program didn't put there
+            # (cache_dir may be a directory shared with other files)
+            if (
+                entry.name.endswith((".meta.json", ".part"))
+                or not is_cache_file(entry.name)
+                or not entry.is_file()
+            ):
+                continue
+            st = entry.stat()
+            files.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+
+    if total <= max_bytes:
+        return
+
+    dprint("pruning cache directory %s (%d bytes)" % (cache_dir, total))
+    files.sort()
+    for _, size, path in files:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError as e:
+            dprint("could not remove %s: %s" % (path, e))
+            continue
+        total -= size
+
+        meta_path: str = os.path.splitext(path)[0] + ".meta.json"
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+
+def read_cache_meta(meta_path: str) -> dict:
+    """Reads the validators (ETag and Last-Modified) saved for a cached web
+    image.
+
+    Args:
+        :param:`meta_path: str` - the path to the image's sidecar meta file
+
+    Returns:
+        ::return:`dict` - the saved validators, or an empty dict if there
+        are none
+
+    Called by:
+        ::function:`download_web_img()`
+    """
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_cache_meta(meta_path: str, headers) -> None:
+    """Saves the validators (ETag and Last-Modified) from a web image
+    response, for conditional requests on later runs.
+
+    Args:
+        :param:`meta_path: str` - the path to the image's sidecar meta file
+        :param:`headers` - the headers of the http response
+
+    Called by:
+        ::function:`download_web_img()`
+    """
+    meta: dict = {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+    if not any(meta.values()):
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        return
+
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
 # have pylint ignore too many local variables
 def download_ssh_img(cache_dir: str, ssh_path: str) -> str:  # pylint: disable=R0914
     """Downloads the remote (ssh) image to the cache directory specified in
@@ -776,6 +1622,8 @@ def download_ssh_img(cache_dir: str, ssh_path: str) -> str:  # pylint: disable=R
 
     Calls:
         ::function:`ssh_path_elements()`
+        ::function:`ssh_options()`
+        ::function:`get_cache_path()`
     """
 
     user, password, server, path = ssh_path_elements(ssh_path)
@@ -797,14 +1645,17 @@ def download_ssh_img(cache_dir: str, ssh_path: str) -> str:  # pylint: disable=R
     # scp user@host:/path cache_dir
     host_path = "%s:%s" % (user_and_host, escaped_path)
     filename = os.path.basename(path)
-    cache_path = "%s/%s" % (cache_dir, filename)
+    cache_path = get_cache_path(cache_dir, ssh_path)
 
     # if already in cache, don't download again
     if os.path.exists(cache_path):
         dprint("Using img " + filename + " from cache directory")
         return cache_path
 
-    cmd += ["/usr/bin/scp", host_path, cache_path]
+    # copy to a temporary file, and only move it into place once complete,
+    # so that an interrupted copy is never mistaken for a cached image
+    part_path = cache_path + ".part"
+    cmd += ["/usr/bin/scp", *ssh_options(), host_path, part_path]
 
     dprint("cmd=%s" % cmd)
 
@@ -815,6 +1666,10 @@ def download_ssh_img(cache_dir: str, ssh_path: str) -> str:  # pylint: disable=R
         )
     except subprocess.CalledProcessError as e:
         print("Error: Executing '%s'\n%s" % (" ".join(cmd), e.stderr))
+        return ""
+    except subprocess.TimeoutExpired:
+        print("Error: Timed out executing '%s'" % " ".join(cmd))
+        return ""
 
     dprint("done")
     out = p.stdout.decode("utf-8")
@@ -822,178 +1677,271 @@ def download_ssh_img(cache_dir: str, ssh_path: str) -> str:  # pylint: disable=R
     dprint("out=%s" % out)
     dprint("err=%s" % err)
 
-    if os.path.exists(cache_path):
-        filepath = cache_path
-    else:
-        filepath = ""
+    if not os.path.exists(part_path):
+        return ""
 
-    return filepath
+    os.replace(part_path, cache_path)
+    cache_file_added(cache_dir)
+    return cache_path
 
 
 def preload_imgs():
-    """Immediately loads/downloads the first :hardcoded:`2` images.
+    """Immediately loads/downloads the first `config.max_preload` images,
+    in parallel, and starts downloading the rest of the remote images into
+    the cache in the background.  That background download is skipped when
+    `config.max_cache_mb` limits the cache, as prune_cache() would evict the
+    gallery as fast as it arrives; images are then downloaded as the
+    prefetch thread reaches them.
 
     Called by:
         ::__main__:`main()`
 
     Calls:
         ::SlideshowImage_method:`load_pil_from_path()`
+        ::SlideshowImage_method:`get_image_local()`
     """
 
-    global config
-    global slideshow_imgs
-    global preload_index
-
     dprint("ENTERING PRELOAD_IMGS")
 
-    for i in range(config.max_preload):
-        try:
-            slideshow_imgs[i].load_pil_from_path()
-        except IndexError:
-            print("IN preload_imgs(): could not load img at index '%s'" % i)
+    count: int = min(config.max_preload, len(slideshow_imgs))
+    futures: list = [
+        download_pool.submit(
+            slideshow_imgs[i].load_pil_from_path, (screen_width, screen_height)
+        )
+        for i in range(count)
+    ]
+
+    # queue the remaining downloads behind the first images
+    if config.max_cache_mb <= 0:
+        for img in slideshow_imgs[count:]:
+            if img.is_remote():
+                background_downloads.append(download_pool.submit(img.get_image_local))
+
+    for future in futures:
+        future.result()
 
-    preload_index = i
+    for i in range(count):
+        if slideshow_imgs[i].pil_img:
+            img_cache.add(slideshow_imgs[i])
 
     # async_preload_img()
     dprint("EXITING PRELOAD_IMGS")
 
 
-def resize_img(img: Image.Image) -> Image.Image:
+def flatten_img(img: Image.Image) -> Image.Image:
+    """Converts a pil img to RGB mode.  Transparent parts are filled with
+    black, the color of the canvas they used to be shown on.
+
+    Args:
+        ::param:`img: Image.Image` - the pil img to convert
+
+    Returns:
+        ::return:`Image.Image` - the RGB pil img
+
+    Called by:
+        ::SlideshowImage_method:`load_pil_from_path()`
+    """
+    if img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info:
+        background: Image.Image = Image.new("RGBA", img.size, (0, 0, 0, 255))
+        img = Image.alpha_composite(background, img.convert("RGBA"))
+
+    return img.convert("RGB")
+
+
+def resize_img(img: Image.Image, size: tuple) -> Image.Image:
     """Takes a pil img and returns a resized pil img.
 
     Args:
         ::param:`img: Image.Image` - the pil img to be resized
+        ::param:`size: tuple` - the (width, height) of the window to fit the
+            img to; the caller labels the result with the same size
 
     Returns:
         ::return:`Image.Image` - the resized pil img
 
     Called by:
-        ::function:`update_img()`
+        ::function:`show_img()`
+        ::function:`prefetch_loop()`
     """
 
     img_w, img_h = img.size
-    w_scale_factor: float = win_width / img_w
-    h_scale_factor: float = win_height / img_h
+    w_scale_factor: float = size[0] / img_w
+    h_scale_factor: float = size[1] / img_h
 
-    # Picks the minimum between the vertical or horizontal scale factor, then takes the minimum
-    # between the scale factor and the max_resize configuration setting.
-    scale_factor = min(min(w_scale_factor, h_scale_factor), config.max_resize)
+    # Picks the minimum of the vertical and horizontal scale factors and the
+    # max_resize configuration setting.
+    scale_factor: float = min(w_scale_factor, h_scale_factor, config.max_resize)
     # print(f"DEBUG: scale_factor = {scale_factor}, config.max_resize = {config.max_resize}")
 
-    if scale_factor < 0.95 or scale_factor > 1.05:
-        return img.resize((int(img_w * scale_factor), int(img_h * scale_factor)))
+    if 0.95 <= scale_factor <= 1.05:
+        return img
+
+    new_size: tuple = (int(img_w * scale_factor), int(img_h * scale_factor))
+    if scale_factor < 0.5:
+        # For big reductions, let PIL shrink the image by a whole factor
+        # first (like thumbnail() does), then filter the smaller image.
+        # thumbnail() itself would resize the cached image in place.
+        return img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
 
-    return img
+    return img.resize(new_size, Image.Resampling.BILINEAR, reducing_gap=3.0)
 
 
 # Define rotation through each image in the directory after WAIT_TIME seconds
+def show_img(img: SlideshowImage, size: tuple):
+    """Makes the tk img for a loaded image, resizing it for the window size
+    if the prefetch thread has not already done so.
+
+    Args:
+        ::param:`img: SlideshowImage` - the image to show, with pil_img loaded
+        ::param:`size: tuple` - the (width, height) of the window
+
+    Called by:
+        ::function:`update_img()`
+
+    Calls:
+        ::function:`resize_img()`
+    """
+    # use the image resized by the prefetch thread, if it was resized for
+    # the current window size
+    if img.resized_pil and img.resized_for == size:
+        dprint("using prefetched resized image")
+        pil_img_r: Image.Image = img.resized_pil
+    else:
+        pil_img_r = resize_img(img.pil_img, size)
+        img.resized_pil = pil_img_r
+        img.resized_for = size
+        img.resized_data = b""
+
+    # Save tkinter img into global array for python reference counting.
+    # Prefer the data encoded by the prefetch thread; it is only needed once.
+    img.tk_img = None
+    if img.resized_data:
+        try:
+            img.tk_img = tkinter.PhotoImage(data=img.resized_data)
+        except tkinter.TclError as e:
+            dprint("could not read prefetched image data: %s" % e)
+        img.resized_data = b""
+    if img.tk_img is None:
+        img.tk_img = ImageTk.PhotoImage(pil_img_r)
+
+
 def update_img():
     """Takes the PIL img, resizes according to current screen dimenstions, creates tk img, and
     adds the tk img to the tk canvas.
 
     Called by:
-        ::function:`next_img()`
-        ::function:`rotate_img_forward()`
-        ::function:`rotate_img_back()`
+        ::function:`advance_img()`
+        ::function:`toggle_pause()`
+        ::function:`on_configure()`
 
     Calls:
-        ::function:`resize_img()`
+        ::function:`get_prefetched_imgs()`
+        ::function:`touch_cache_file()`
+        ::function:`show_img()`
     """
 
-    global slideshow_imgs
-    global imgs_index
-    global win_width, win_height
-    global canvas
-    global is_paused
+    global shown
 
     dprint("IN UPDATE IMG: imgs_index = " + str(imgs_index))
 
-    # IF no pil_img at imgs_i of SlideshowImage:
-    if not slideshow_imgs[imgs_index].pil_img:
-        slideshow_imgs[imgs_index].load_pil_from_path()
+    get_prefetched_imgs()
+
+    img: SlideshowImage = slideshow_imgs[imgs_index]
+    if not img.pil_img:
+        img.load_pil_from_path((screen_width, screen_height))
     else:
         dprint("using already-loaded image")
+        # it is still being shown, so keep its cache file from being pruned
+        if img.is_remote() and img.local_filepath:
+            touch_cache_file(img.local_filepath)
 
     # Resize the PIL image; throw error if there is no PIL image at the index.
-    if not slideshow_imgs[imgs_index].pil_img:
-        print(
-            "ERROR, pil_img was None, img_path =", slideshow_imgs[imgs_index].img_path
-        )
+    if not img.pil_img:
+        print("ERROR, pil_img was None, img_path =", img.img_path)
         return
 
-    pil_img_r: Image.Image = resize_img(slideshow_imgs[imgs_index].pil_img)
+    img_cache.pinned = img
+    img_cache.add(img)
 
-    # Save tkinter img into global array for python reference counting.
-    slideshow_imgs[imgs_index].tk_img = ImageTk.PhotoImage(pil_img_r)
+    # nothing to redraw if this image is already shown at this size (e.g.
+    # when only the pause status changed)
+    size: tuple = (win_width, win_height)
+    last_shown: tuple = shown
+    if shown == (img, size) and img.tk_img:
+        dprint("image is already shown")
+    else:
+        show_img(img, size)
+        shown = (img, size)
 
-    canvas.delete("all")
+    # retarget the existing canvas items, instead of recreating them
+    canvas.coords(canvas_img, win_width / 2, win_height / 2)
+    canvas.itemconfigure(canvas_img, image=img.tk_img)
 
-    win_width = win.winfo_width()
-    win_height = win.winfo_height()
+    # only keep the tk img that is on the canvas; tk holds its own copy of
+    # the pixels of each one, so keeping one per cached image adds up
+    if last_shown and last_shown[0] is not img:
+        last_shown[0].tk_img = None
 
-    canvas.create_image(
-        (win_width) / 2,
-        (win_height) / 2,
-        anchor=tkinter.CENTER,
-        image=slideshow_imgs[imgs_index].tk_img,
-    )
+    # show or hide the paused status
+    pause_state: str = tkinter.NORMAL if is_paused else tkinter.HIDDEN
+    canvas.coords(pause_bg, win_width / 2 - 50, 36, win_width / 2 + 50, 64)
+    canvas.coords(pause_text, win_width / 2, 50)
+    canvas.itemconfigure(pause_bg, state=pause_state)
+    canvas.itemconfigure(pause_text, state=pause_state)
 
-    if is_paused:
-        # show paused status
-        # Put text on a black background for readability
-        canvas.create_rectangle(
-            (win_width) / 2 - 50, 36, (win_width) / 2 + 50, 64, fill="black"
-        )
-        canvas.create_text(
-            (win_width) / 2,
-            50,
-            anchor=tkinter.CENTER,
-            text=" paused ",
-            fill="white",
-            font=("Helvetica 15 bold"),
-        )
-        canvas.pack()
 
+def advance_img(delta: int):
+    """Moves imgs_index delta images forward (or back, if delta is negative),
+    wrapping around at the ends of the list, shows that image, and wakes up
+    the prefetch thread for the images after it.
 
-def next_img():
-    """Updates the imgs_index, then calls update_img() to put the image to the screen.
-    It then schedules itself to be called again after wait_time amount of time.
+    Args:
+        ::param:`delta: int` - how many images to move by
 
     Called by:
-        ::__main__:`main()`
         ::function:`next_img()`
+        ::function:`rotate_img_forward()`
+        ::function:`rotate_img_back()`
 
     Calls:
         ::function:`update_img()`
-        ::function:`next_img()`
         ::function:`async_preload_img()`
     """
 
     global imgs_index
-    global is_paused
 
-    if not is_paused:
-        last_img = slideshow_imgs[imgs_index]
-        imgs_index += 1
-        if imgs_index >= len(slideshow_imgs) - 1:
-            imgs_index -= len(slideshow_imgs)
-        if imgs_index < 0:
-            imgs_index += len(slideshow_imgs)
+    imgs_index = (imgs_index + delta) % len(slideshow_imgs)
+    update_img()
+    async_preload_img()
+
+
+def next_img():
+    """Shows the next image, then schedules itself to be called again after
+    wait_time amount of time.
+
+    Called by:
+        ::__main__:`main()`
+        ::function:`next_img()`
 
-        update_img()
+    Calls:
+        ::function:`advance_img()`
+        ::function:`next_img()`
+    """
+
+    if not is_paused:
+        last_img: SlideshowImage = slideshow_imgs[imgs_index]
+        advance_img(1)
 
         if config.small_memory:
-            dprint("Unloading img: %s" % last_img.img_path)
-            last_img.tk_img = None
-            last_img.pil_img = None
+            img_cache.discard(last_img)
+            last_img.unload()
 
     win.after(config.wait_time, next_img)
-    async_preload_img()
 
 
 # have pylint ignore unused arg 'event'
 def rotate_img_forward(event):  # pylint: disable=W0613
-    """Increments imgs_index then calls update_img()
+    """Shows the next image.
 
     Args:
         ::param:`event` - keypress event
@@ -1002,23 +1950,15 @@ def rotate_img_forward(event):  # pylint: disable=W0613
         ::function:`init_window()`
 
     Calls:
-        ::function:`update_img()`
+        ::function:`advance_img()`
     """
 
-    global imgs_index
-
-    imgs_index += 1
-    if imgs_index >= len(slideshow_imgs) - 1:
-        imgs_index -= len(slideshow_imgs)
-    if imgs_index < 0:
-        imgs_index += len(slideshow_imgs)
-
-    update_img()
+    advance_img(1)
 
 
 # have pylint ignore unused arg 'event'
 def rotate_img_back(event):  # pylint: disable=W0613
-    """Decrements imgs_index then calls update_img()
+    """Shows the previous image.
 
     Args:
         ::param:`event` - keypress event
@@ -1027,19 +1967,10 @@ def rotate_img_back(event):  # pylint: disable=W0613
         ::function:`init_window()`
 
     Calls:
-        ::function:`update_img()`
+        ::function:`advance_img()`
     """
 
-    global imgs_index
-
-    imgs_index -= 1
-
-    if imgs_index >= len(slideshow_imgs) - 1:
-        imgs_index -= len(slideshow_imgs)
-    if imgs_index < 0:
-        imgs_index += len(slideshow_imgs)
-
-    update_img()
+    advance_img(-1)
 
 
 def update_win_info():
@@ -1048,20 +1979,49 @@ def update_win_info():
 
     Called by:
         ::function:`init_window()`
-        ::function:`update_win_info()`
+    """
+
+    global win_width, win_height
+
+    # the window reports a size of 1x1 until it is mapped; keep the
+    # starting size until then
+    if win.winfo_width() > 1 and win.winfo_height() > 1:
+        win_width = win.winfo_width()
+        win_height = win.winfo_height()
+
+
+def on_configure(event):
+    """Updates global win_width and win_height when the window is resized,
+    and schedules the image to be redrawn at the new size.
+
+    Args:
+        ::param:`event` - configure event
+
+    Called by:
+        ::function:`init_window()`
 
     Calls:
-        ::function:`update_win_info()`
+        ::function:`update_img()`
     """
 
     global win_width, win_height
-    global win
+    global resize_job
+
+    # the binding on the window also gets the events for its children
+    if event.widget is not win:
+        return
 
-    win_width = win.winfo_width()
-    win_height = win.winfo_height()
-    # dprint("win_width")
+    if (event.width, event.height) != (win_width, win_height):
+        dprint("window resized to %sx%s" % (event.width, event.height))
+        win_width = event.width
+        win_height = event.height
 
-    win.after(1, update_win_info)
+        # redraw the image at the new size, once the window has stopped
+        # changing size (dragging the border sends a stream of events)
+        if imgs_index >= 0:
+            if resize_job:
+                win.after_cancel(resize_job)
+            resize_job = win.after(RESIZE_DELAY, update_img)
 
 
 def main():
@@ -1069,13 +2029,22 @@ def main():
 
     global _debug
     global config
+    global prefetch_q
     global is_full, win_width, win_height
-    global win
 
     if "--debug" in sys.argv:
         _debug = True
         sys.argv.remove("--debug")
 
+    # pillow-simd reports a version ending in '.postN'
+    dprint("using Pillow %s" % PIL.__version__)
+    # JPEG decoding is the bulk of the work for most slides, and is several
+    # times faster with libjpeg-turbo than with the reference libjpeg
+    if features.check_feature("libjpeg_turbo"):
+        dprint("JPEG decoding uses libjpeg-turbo %s" % features.version("jpg"))
+    else:
+        dprint("Warning: Pillow was not built with libjpeg-turbo")
+
     config_file: str = find_config_file()
     dprint(config_file)
 
@@ -1085,6 +2054,8 @@ def main():
         sys.exit(0)
 
     config = Config(config_file)
+    # leave room for the preloaded images and the one on screen
+    img_cache.maxsize = max(config.max_loaded_imgs, config.max_preload + 2)
 
     is_full = config.start_full
     win_width = config.win_start_width
@@ -1093,6 +2064,7 @@ def main():
     define_cache(config)
     init_window()
     get_paths(config.sources)
+    remove_dead_paths()
 
     if not slideshow_imgs:
         eprint(
@@ -1104,10 +2076,13 @@ def main():
 
     print("Slideshow is running in another window...")
     preload_imgs()
+    prefetch_q = queue.Queue(maxsize=config.max_preload)
+    threading.Thread(target=prefetch_loop, daemon=True).start()
+    # resize the first images in the background, while the window opens
+    async_preload_img()
 
     # start updating images after mainloop starts
     win.after(100, next_img)
-    # win.after(200, async_preload_img())
 
     win.mainloop()
 
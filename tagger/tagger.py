@@ -1,5 +1,6 @@
 import os
 import sys
+import stat
 import sqlite3
 import hashlib
 import datetime as dt
@@ -7,8 +8,19 @@ import traceback
 import contextlib
 
 DBFILE = "tagger.db"
+# Rows per multi-row INSERT or IN list; keeps each statement under SQLite's
+# old 999 parameter limit (2 params per tag_files row)
+SQL_CHUNK_SIZE = 450
+# Bytes hashed from each of the start, end and middle of a file
+FINGERPRINT_CHUNK_SIZE = 64000
 _debug = False
 
+INDEX_SCHEMA = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tags_name ON tags(name);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_files_dir_name ON files(directory, name);
+CREATE INDEX IF NOT EXISTS idx_tag_files_file ON tag_files(file_id);
+"""
+
 
 def dprint(*args, **kwargs):
     """Debug print wrapper."""
@@ -135,6 +147,22 @@ def gen_db_path(is_system=False) -> str:
     return file_path
 
 
+def connect_db(db_path) -> sqlite3.Connection:
+    """Opens a connection to the database with the pragmas tagger relies on.
+
+    synchronous=NORMAL skips the extra journal fsyncs on commit, and
+    temp_store=MEMORY keeps sort/DISTINCT temp tables off disk. The pragmas are
+    best-effort, so a database the user can only read (e.g. /etc) still opens.
+    """
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute("PRAGMA temp_store=MEMORY")
+    except sqlite3.OperationalError as err:
+        dprint(f"Could not set pragmas on {db_path}: {err}")
+    return con
+
+
 def init_database(is_system=False) -> None:
     """Initialize the tagger.db database if one doesn't already exist on
     current device.
@@ -145,7 +173,7 @@ def init_database(is_system=False) -> None:
     path = gen_db_path(is_system)
     had_error = False
 
-    with contextlib.closing(sqlite3.connect(path)) as con:
+    with contextlib.closing(connect_db(path)) as con:
         cur = con.cursor()
         try:
             cur.executescript(
@@ -173,6 +201,9 @@ CREATE TABLE IF NOT EXISTS tag_files(
     FOREIGN KEY (file_id) REFERENCES files (file_id)
         ON DELETE CASCADE ON UPDATE NO ACTION
 );
+"""
+                + INDEX_SCHEMA
+                + """
 COMMIT;
                 """
             )
@@ -201,19 +232,93 @@ def get_fingerprint(file):
     """Gets the fingerprint for the passed file.
 
     Fingerprint is the sha1 hash of bytes from beginning, end, and middle of file.
+    Files smaller than one chunk are hashed whole.
     """
 
     h = hashlib.sha1()
-    f = open(file, "rb")
-    h.update(f.read(64000))
-    pos = f.seek(-64000, 2)
-    h.update(f.read(64000))
-    f.seek(pos // 2, 0)
-    h.update(f.read(64000))
-    f.close()
+    with open(file, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < FINGERPRINT_CHUNK_SIZE:
+            h.update(f.read())
+            return h.hexdigest()
+        h.update(f.read(FINGERPRINT_CHUNK_SIZE))
+        pos = f.seek(size - FINGERPRINT_CHUNK_SIZE)
+        h.update(f.read(FINGERPRINT_CHUNK_SIZE))
+        f.seek(pos // 2)
+        h.update(f.read(FINGERPRINT_CHUNK_SIZE))
     return h.hexdigest()
 
 
+def get_chunks(items: list):
+    """Yields successive slices of items, each at most SQL_CHUNK_SIZE long."""
+    for i in range(0, len(items), SQL_CHUNK_SIZE):
+        yield items[i : i + SQL_CHUNK_SIZE]
+
+
+def select_file_ids(cur, file_keys: dict) -> dict:
+    """Gets the file_id of each (directory, name) key of file_keys that is
+    already in the files table.
+    """
+    file_ids = {}
+    dirs = list({dirname for dirname, _ in file_keys})
+    for chunk in get_chunks(dirs):
+        placeholders = ",".join("?" * len(chunk))
+        cur.execute(
+            "SELECT directory, name, file_id FROM files"
+            f" WHERE directory IN ({placeholders})",
+            chunk,
+        )
+        file_ids.update(
+            ((dirname, name), file_id)
+            for dirname, name, file_id in cur.fetchall()
+            if (dirname, name) in file_keys
+        )
+    return file_ids
+
+
+def select_tag_ids(cur, tags: list) -> dict:
+    """Gets the tag_id of each of the tags, keyed by tag name."""
+    tag_ids = {}
+    for chunk in get_chunks(tags):
+        placeholders = ",".join("?" * len(chunk))
+        cur.execute(
+            f"SELECT name, tag_id FROM tags WHERE name IN ({placeholders})", chunk
+        )
+        tag_ids.update(cur.fetchall())
+    return tag_ids
+
+
+def insert_files(cur, file_keys: dict) -> dict:
+    """Inserts the files of file_keys that aren't in the files table yet, and
+    gets the file_id of every file, keyed by (directory, name).
+    """
+    file_ids = select_file_ids(cur, file_keys)
+    dprint(f"Files already found in database: {list(file_ids)}")
+    new_files = []
+    for (file_dirname, file_basename), (file_abspath, file_stat) in file_keys.items():
+        if (file_dirname, file_basename) in file_ids:
+            continue
+        is_dir = stat.S_ISDIR(file_stat.st_mode)
+        new_files.append(
+            (
+                file_basename,
+                file_dirname,
+                None if is_dir else get_fingerprint(file_abspath),
+                dt.datetime.now(),
+                file_stat.st_size,
+                is_dir,
+            )
+        )
+    if new_files:
+        cur.executemany(
+            "INSERT INTO files(name, directory, fingerprint, mod_time, size, is_dir) VALUES(?, ?, ?, ?, ?, ?)",
+            new_files,
+        )
+        dprint(f"{len(new_files)} file(s) inserted into table files.")
+        file_ids = select_file_ids(cur, file_keys)
+    return file_ids
+
+
 def add_tags_to_files(tags, files: list) -> None:
     """Add the specified tags to the specified files in the database."""
 
@@ -221,48 +326,31 @@ def add_tags_to_files(tags, files: list) -> None:
 
     dprint(f"Adding {tags=} to {files=}...")
 
-    with sqlite3.connect(find_db_path()) as con:
+    with connect_db(find_db_path()) as con:
         cur = con.cursor()
         try:
-            tag_ids = []
-            file_ids = []
+            # Databases created before the indexes existed get them here
+            cur.executescript(INDEX_SCHEMA)
 
             # Insert tags into database:
-            for tag in tags:
-                dprint(f"Checking if {tag} is already in database...")
-                if not cur.execute(
-                    "SELECT name FROM tags WHERE name = (?)", (tag,)
-                ).fetchone():
-                    cur.execute("INSERT INTO tags(name) VALUES (?)", (tag,))
-                    dprint(f"{tag} inserted into table tags.")
-                    tag_ids.append(cur.lastrowid)
-                else:
-                    dprint(
-                        f"Tag {tag} was already found in database:",
-                        "Tags{}".format(
-                            cur.execute(
-                                "SELECT * FROM tags WHERE name = (?)", (tag,)
-                            ).fetchone()
-                        ),
-                        sep=" ",
-                    )
-                    tag_ids.append(
-                        *cur.execute(
-                            "SELECT tag_id FROM tags WHERE name = (?)", (tag,)
-                        ).fetchone()
-                    )
+            cur.executemany(
+                "INSERT OR IGNORE INTO tags(name) VALUES (?)", [(tag,) for tag in tags]
+            )
+            dprint(f"{cur.rowcount} new tag(s) inserted into table tags.")
+            tag_ids = select_tag_ids(cur, tags)
 
-            # Insert files into database:
+            # Collect the files, keyed by (directory, name):
+            file_keys = {}
             for file in files:
                 # Check that the file exists:
-                if not os.path.exists(file):
+                try:
+                    file_stat = os.stat(file)
+                except FileNotFoundError:
                     print(f"Could not find {file}.")
-                    files.remove(file)
                     continue
 
                 file_abspath = os.path.abspath(file)
-                file_basename = os.path.basename(file_abspath)
-                file_dirname = os.path.dirname(file_abspath)
+                file_dirname, file_basename = os.path.split(file_abspath)
 
                 dprint(
                     f"{file_abspath = }",
@@ -270,51 +358,25 @@ def add_tags_to_files(tags, files: list) -> None:
                     f"{file_dirname = }",
                     sep="\n\t",
                 )
+                file_keys[(file_dirname, file_basename)] = (file_abspath, file_stat)
 
-                dprint(f"Checking if {file_abspath} is already in database...")
-                if not cur.execute(
-                    "SELECT name FROM files WHERE name = (?) AND directory = (?)",
-                    (file_basename, file_dirname),
-                ).fetchone():
-                    cur.execute(
-                        "INSERT INTO files(name, directory, fingerprint, mod_time, size, is_dir) VALUES(?, ?, ?, ?, ?, ?)",
-                        (
-                            file_basename,
-                            file_dirname,
-                            get_fingerprint(file_abspath),
-                            dt.datetime.now(),
-                            os.stat(file_abspath).st_size,
-                            os.path.isdir(file_abspath),
-                        ),
-                    )
-                    dprint(f"{file_basename} inserted into table files.")
-                    file_ids.append(cur.lastrowid)
-                else:
-                    dprint(
-                        f"File {file_basename} was already found in database:",
-                        "Files{}".format(
-                            cur.execute(
-                                "SELECT * FROM files WHERE name = (?)", (file_basename,)
-                            ).fetchone()
-                        ),
-                        sep=" ",
-                    )
-                    file_ids.append(
-                        *cur.execute(
-                            "SELECT file_id FROM files WHERE name = (?)",
-                            (file_basename,),
-                        ).fetchone()
-                    )
+            # Insert files into database:
+            file_ids = insert_files(cur, file_keys)
 
             dprint(f"{tag_ids = }, {file_ids = }")
 
             # Connect files to tags in fileTags table in database:
-            for tag_id in tag_ids:
-                for file_id in file_ids:
-                    cur.execute(
-                        "INSERT INTO tag_files(tag_id, file_id) VALUES (?, ?)",
-                        (tag_id, file_id),
-                    )
+            pairs = [
+                (tag_id, file_id)
+                for tag_id in tag_ids.values()
+                for file_id in file_ids.values()
+            ]
+            for chunk in get_chunks(pairs):
+                cur.execute(
+                    "INSERT OR IGNORE INTO tag_files(tag_id, file_id) VALUES "
+                    + ",".join(["(?, ?)"] * len(chunk)),
+                    [value for pair in chunk for value in pair],
+                )
 
         except Exception as err:
             eprint(err, "Traceback:")
@@ -373,7 +435,7 @@ def list_tags():
 
         dprint(f"{files = }")
 
-    with sqlite3.connect(find_db_path()) as con:
+    with connect_db(find_db_path()) as con:
         cur = con.cursor()
         try:
             # List all unused tags in the database
@@ -394,7 +456,7 @@ def list_tags():
                     print(tag)
                 return
 
-            tags = []
+            tags = {}
             for file in files:
                 fpath = os.path.abspath(file)
                 fname = os.path.basename(fpath)
@@ -415,11 +477,9 @@ ORDER BY f.name;
                 )
                 found_tags = [tag for (tag,) in cur.fetchall()]
                 dprint(f"{found_tags = }")
-                for found_tag in found_tags:
-                    if found_tag not in tags:
-                        tags.append(found_tag)
+                tags.update(dict.fromkeys(found_tags))
 
-            dprint(f"Files associated with tag(s) {tags}:")
+            dprint(f"Tags associated with file(s) {files}:")
             for tag in tags:
                 print(tag)
 
@@ -442,7 +502,7 @@ def list_files():
 
     dprint(f"{tags = }")
 
-    with sqlite3.connect(find_db_path()) as con:
+    with connect_db(find_db_path()) as con:
         cur = con.cursor()
         try:
             # List all the files in the database
@@ -454,27 +514,23 @@ def list_files():
                     print(file)
                 return
 
-            files = []
-            for tag in tags:
-                cur.execute(
-                    """
+            # One query for all tags; DISTINCT lists a file with several once
+            placeholders = ",".join("?" * len(tags))
+            cur.execute(
+                f"""
 SELECT DISTINCT f.directory, f.name
 FROM files f
     JOIN tag_files tf
         ON f.file_id = tf.file_id
     JOIN tags t
         ON tf.tag_id = t.tag_id
-WHERE t.name = (?)
-ORDER BY f.name;
-                    """,
-                    (str(tag),),
-                )
-                dir_files = cur.fetchall()  # Formatted [(dir, file), (dir, file), ...]
-                paths = [dir + os.sep + fname for dir, fname in dir_files]
-                dprint(f"{paths = }")
-                for path in paths:
-                    if path not in files:
-                        files.append(path)
+WHERE t.name IN ({placeholders})
+ORDER BY f.name, f.directory;
+                """,
+                tags,
+            )
+            dir_files = cur.fetchall()  # Formatted [(dir, file), (dir, file), ...]
+            files = [dir + os.sep + fname for dir, fname in dir_files]
 
             dprint(f"Files associated with tag(s) {tags}:")
             for file in files: